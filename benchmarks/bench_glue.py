@@ -0,0 +1,51 @@
+import migen
+
+from amaranth import *
+
+from zyp_amaranth_libs.litex_glue import Glue
+
+from .common import measure, report
+
+class StandInPlatform:
+    # Just enough of a LiteX platform for Glue and PadsProxy; requests hand out fresh pads.
+    device = 'standin'
+    output_dir = None
+
+    def __init__(self, width):
+        self.width = width
+
+    def request(self, name, number = None):
+        return migen.Signal(self.width, name = f'{name}_{number}')
+
+def bench(buses, width, xdr, domain):
+    glue = Glue(StandInPlatform(width), cache = False)
+    glue.connect_domain('sys')
+
+    for n in range(buses):
+        i = glue.platform_proxy.request('in', n, dir = 'i', xdr = xdr, domain = domain)
+        o = glue.platform_proxy.request('out', n, dir = 'o', xdr = xdr, domain = domain)
+
+        if xdr and domain is None:
+            glue.m.d.comb += [
+                i.i_clk.eq(ClockSignal()),
+                o.o_clk.eq(ClockSignal()),
+            ]
+
+        if xdr == 2:
+            glue.m.d.sync += [
+                o.o0.eq(i.i0),
+                o.o1.eq(i.i1),
+            ]
+        else:
+            glue.m.d.sync += o.o.eq(i.i)
+
+    glue.generate_verilog()
+
+def main():
+    for xdr in [0, 1, 2]:
+        for buses in [4, 32]:
+            for domain in [None, 'sync'] if xdr else [None]:
+                report(f'Glue xdr={xdr}, {buses}x32 bit buses, domain={domain}', measure(lambda: bench(buses, 32, xdr, domain)))
+
+if __name__ == '__main__':
+    main()
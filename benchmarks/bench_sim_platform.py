@@ -0,0 +1,66 @@
+from amaranth import *
+from amaranth.build import Resource, Pins
+from amaranth.hdl import ir
+from amaranth.sim import Simulator
+
+from zyp_amaranth_libs.sim_platform import SimPlatform
+
+from .common import measure, report
+
+CYCLES = 200
+
+class Loopback(Elaboratable):
+    def __init__(self, pins, xdr):
+        self.pins = pins
+        self.xdr = xdr
+
+    def elaborate(self, platform):
+        m = Module()
+
+        for n in range(self.pins):
+            i = platform.request('in', n, xdr = self.xdr)
+            o = platform.request('out', n, xdr = self.xdr)
+
+            if self.xdr:
+                m.d.comb += [
+                    i.i_clk.eq(ClockSignal()),
+                    o.o_clk.eq(ClockSignal()),
+                ]
+
+            m.d.sync += o.o.eq(i.i)
+
+        return m
+
+def bench(pins, xdr, active):
+    platform = SimPlatform([
+        *(Resource('in', n, Pins(f'i{n}', dir = 'i')) for n in range(pins)),
+        *(Resource('out', n, Pins(f'o{n}', dir = 'o')) for n in range(pins)),
+    ], [])
+
+    fragment = ir.Fragment.get(Loopback(pins, xdr), platform)
+
+    sim = Simulator(fragment)
+    sim.add_clock(1e-6)
+
+    platform.prepare(sim)
+
+    # Only the first `active` input pads toggle, so the cost of idle pins shows up separately.
+    inputs = [port.port.io for n in range(active) for port in platform.sim_ports('in', n)]
+
+    async def testbench(sim):
+        for cycle in range(CYCLES):
+            for io in inputs:
+                await io.set(cycle & 1)
+            await sim.tick()
+
+    sim.add_testbench(testbench)
+    sim.run()
+
+def main():
+    for xdr in [0, 1]:
+        for pins in [8, 64, 256]:
+            report(f'SimPlatform xdr={xdr}, {pins} pins, all active', measure(lambda: bench(pins, xdr, pins)), CYCLES, 'cycles')
+            report(f'SimPlatform xdr={xdr}, {pins} pins, 1 active', measure(lambda: bench(pins, xdr, 1)), CYCLES, 'cycles')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+from amaranth import *
+from amaranth.sim import Simulator
+
+from zyp_amaranth_libs.stream import StreamSignature, Buffer
+
+from .common import measure, report
+
+BEATS = 2000
+PACKETS = 20
+PACKET_LENGTH = 256
+
+def run(dut, *testbenches):
+    sim = Simulator(dut)
+    sim.add_clock(1e-6)
+
+    for testbench in testbenches:
+        sim.add_testbench(testbench)
+
+    sim.run()
+
+def bench_send_recv():
+    dut = Buffer(StreamSignature(32))
+
+    async def sender(sim):
+        for i in range(BEATS):
+            await dut.input.send(sim, i)
+
+    async def receiver(sim):
+        for i in range(BEATS):
+            await dut.output.recv(sim)
+
+    run(dut, sender, receiver)
+
+def bench_send_recv_many():
+    dut = Buffer(StreamSignature(32))
+
+    async def sender(sim):
+        await dut.input.send_many(sim, range(BEATS))
+
+    async def receiver(sim):
+        await dut.output.recv_many(sim, BEATS)
+
+    run(dut, sender, receiver)
+
+def bench_packets(lanes):
+    dut = Buffer(StreamSignature(8, first = True, last = True, lanes = lanes))
+    packet = [i & 0xff for i in range(PACKET_LENGTH)]
+
+    async def sender(sim):
+        for _ in range(PACKETS):
+            await dut.input.send_packet(sim, packet)
+
+    async def receiver(sim):
+        for _ in range(PACKETS):
+            await dut.output.recv_packet(sim)
+
+    run(dut, sender, receiver)
+
+def bench_packets_bytes(lanes):
+    dut = Buffer(StreamSignature(8, first = True, last = True, lanes = lanes))
+    packet = bytes(i & 0xff for i in range(PACKET_LENGTH))
+
+    async def sender(sim):
+        for _ in range(PACKETS):
+            await dut.input.send_packet_bytes(sim, packet)
+
+    async def receiver(sim):
+        for _ in range(PACKETS):
+            await dut.output.recv_packet_bytes(sim)
+
+    run(dut, sender, receiver)
+
+def main():
+    report('StreamInterface send/recv', measure(bench_send_recv), BEATS, 'beats')
+    report('StreamInterface send_many/recv_many', measure(bench_send_recv_many), BEATS, 'beats')
+
+    for lanes in [4, 16]:
+        report(f'Multilane send/recv_packet ({lanes} lanes)', measure(lambda: bench_packets(lanes)), PACKETS * PACKET_LENGTH, 'words')
+        report(f'Multilane packet bytes ({lanes} lanes)', measure(lambda: bench_packets_bytes(lanes)), PACKETS * PACKET_LENGTH, 'words')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import time
+
+__all__ = [
+    'measure',
+    'report',
+]
+
+def measure(fn, *, repeat = 3):
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def report(name, elapsed, count = None, unit = None):
+    if count is None:
+        print(f'{name:<48} {elapsed * 1e3:10.2f} ms')
+    else:
+        print(f'{name:<48} {elapsed * 1e3:10.2f} ms {count / elapsed:12.0f} {unit}/s')
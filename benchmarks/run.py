@@ -0,0 +1,25 @@
+import argparse
+import importlib
+
+# Suites are imported on demand, since the glue suite needs migen and LiteX.
+SUITES = {
+    'stream': 'bench_stream',
+    'sim_platform': 'bench_sim_platform',
+    'glue': 'bench_glue',
+}
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Run benchmarks.')
+    parser.add_argument('suites', nargs = '*', default = list(SUITES), help = f'suites to run: {", ".join(SUITES)}')
+    args = parser.parse_args()
+
+    for name in args.suites:
+        if name not in SUITES:
+            parser.error(f'unknown suite {name!r}')
+
+    for name in args.suites:
+        print(f'== {name}')
+        importlib.import_module(f'.{SUITES[name]}', __package__).main()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from amaranth import C
+from amaranth.sim import Simulator
+
+from zyp_amaranth_libs.stream import StreamSignature, Arbiter
+
+INPUTS = 3
+BEATS = 60
+
+@pytest.mark.parametrize('policy', ['round-robin', 'priority'])
+@pytest.mark.parametrize('last', [False, True])
+def test_arbiter(policy, last):
+    dut = Arbiter(StreamSignature(16, last = last), INPUTS, policy = policy)
+    received = {i: [] for i in range(INPUTS)}
+
+    def source(i):
+        async def process(ctx):
+            rnd = random.Random(i)
+
+            for k in range(BEATS):
+                while rnd.random() < 0.5:
+                    ctx.set(dut.inputs[i].valid, 0)
+                    await ctx.tick()
+
+                ctx.set(dut.inputs[i].data, i * 1000 + k)
+
+                if last:
+                    ctx.set(dut.inputs[i].last, k % 3 == 2)
+
+                ctx.set(dut.inputs[i].valid, 1)
+                await ctx.tick().until(dut.inputs[i].ready)
+
+            ctx.set(dut.inputs[i].valid, 0)
+
+        return process
+
+    async def sink(ctx):
+        rnd = random.Random(INPUTS)
+        stalled = None
+        owner = None
+
+        while sum(len(values) for values in received.values()) < INPUTS * BEATS:
+            ctx.set(dut.output.ready, rnd.random() < 0.4)
+            _, _, valid, ready, data, end = await ctx.tick().sample(
+                dut.output.valid, dut.output.ready, dut.output.data, dut.output.last if last else C(1))
+
+            # A stalled beat must stay on the output until it's taken.
+            if stalled is not None:
+                assert valid and data == stalled
+
+            stalled = data if valid and not ready else None
+
+            if valid and ready:
+                i = data // 1000
+
+                # Packets from different inputs must not be interleaved.
+                assert owner in (None, i)
+                owner = None if end else i
+
+                received[i].append(data % 1000)
+
+    sim = Simulator(dut)
+    sim.add_clock(1e-6)
+
+    for i in range(INPUTS):
+        sim.add_testbench(source(i), background = True)
+
+    sim.add_testbench(sink)
+    sim.run()
+
+    assert all(values == list(range(BEATS)) for values in received.values())
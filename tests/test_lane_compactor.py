@@ -0,0 +1,125 @@
+import random
+
+from amaranth import Cat
+from amaranth.sim import Simulator
+
+from zyp_amaranth_libs.stream import StreamSignature, LaneCompactor
+
+LANES = 4
+
+def simulate(beats, *, seed = 0):
+    dut = LaneCompactor(StreamSignature(8, first = True, last = True, keep = True, lanes = LANES))
+    rnd = random.Random(seed)
+    packets = []
+
+    async def source(ctx):
+        for data, keep, first, last in beats:
+            for i in range(LANES):
+                ctx.set(dut.input.data[i], data[i])
+                ctx.set(dut.input.keep[i], keep[i])
+                ctx.set(dut.input.first[i], first and i == 0)
+                ctx.set(dut.input.last[i], last and i == LANES - 1)
+
+            while rnd.random() < 0.3:
+                ctx.set(dut.input.valid, 0)
+                await ctx.tick()
+
+            ctx.set(dut.input.valid, 1)
+            await ctx.tick().until(dut.input.ready)
+
+        ctx.set(dut.input.valid, 0)
+
+    async def sink(ctx):
+        expected = sum(last for *_, last in beats)
+        values = []
+        first = None
+
+        for _ in range(100 * len(beats)):
+            if len(packets) == expected:
+                break
+
+            ctx.set(dut.output.ready, rnd.random() < 0.7)
+            _, _, valid, ready, data, keep, first_flags, last_flags = await ctx.tick().sample(
+                dut.output.valid, dut.output.ready, Cat(dut.output.data), Cat(dut.output.keep), Cat(dut.output.first), Cat(dut.output.last))
+
+            if not (valid and ready):
+                continue
+
+            data = [data >> (8 * i) & 0xff for i in range(LANES)]
+            keep, first_flags, last_flags = ([value >> i & 1 for i in range(LANES)] for value in (keep, first_flags, last_flags))
+
+            count = sum(keep)
+
+            # Kept lanes are packed from lane 0, and only a packet's final beat may be partial.
+            assert keep == [i < count for i in range(LANES)]
+            assert count == LANES or any(last_flags)
+
+            if first is None:
+                first = bool(first_flags[0])
+
+            values += data[:count]
+
+            if any(last_flags):
+                assert last_flags == [i == max(count - 1, 0) for i in range(LANES)]
+                packets.append((first, values))
+                values = []
+                first = None
+
+        assert len(packets) == expected
+
+    sim = Simulator(dut)
+    sim.add_clock(1e-6)
+    sim.add_testbench(source, background = True)
+    sim.add_testbench(sink)
+    sim.run()
+
+    return packets
+
+def expected_packets(beats):
+    packets = []
+    values = []
+
+    for data, keep, first, last in beats:
+        values += [d for d, k in zip(data, keep) if k]
+
+        if last:
+            packets.append((True, values))
+            values = []
+
+    return packets
+
+def check(beats):
+    for seed in range(4):
+        assert simulate(beats, seed = seed) == expected_packets(beats)
+
+def beat(data, keep, *, first = False, last = False):
+    return data, keep, first, last
+
+def test_sparse():
+    check([
+        beat([1, 2, 3, 4], [1, 0, 1, 0], first = True),
+        beat([5, 6, 7, 8], [0, 1, 1, 1]),
+        beat([9, 10, 11, 12], [1, 1, 0, 1], last = True),
+        beat([13, 14, 15, 16], [0, 0, 0, 1], first = True),
+        beat([17, 18, 19, 20], [1, 0, 0, 0], last = True),
+    ])
+
+def test_partial_final():
+    check([
+        beat([1, 2, 3, 4], [1, 1, 1, 1], first = True),
+        beat([5, 6, 7, 8], [1, 1, 0, 0], last = True),
+        beat([9, 10, 11, 12], [0, 1, 0, 0], first = True, last = True),
+        beat([13, 14, 15, 16], [1, 1, 1, 0], first = True),
+        beat([17, 18, 19, 20], [0, 0, 1, 1], last = True),
+    ])
+
+def test_empty_final():
+    check([
+        beat([1, 2, 3, 4], [1, 1, 1, 1], first = True),
+        beat([5, 6, 7, 8], [0, 0, 0, 0], last = True),
+        beat([9, 10, 11, 12], [1, 0, 1, 0], first = True),
+        beat([13, 14, 15, 16], [1, 1, 0, 0]),
+        beat([17, 18, 19, 20], [0, 0, 0, 0], last = True),
+        beat([21, 22, 23, 24], [0, 0, 0, 0], first = True, last = True),
+        beat([25, 26, 27, 28], [0, 1, 1, 0], first = True, last = True),
+    ])
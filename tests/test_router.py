@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from amaranth import C
+from amaranth.sim import Simulator
+
+from zyp_amaranth_libs.stream import StreamSignature, Router
+
+OUTPUTS = 3
+BEATS = 120
+
+@pytest.mark.parametrize('last', [False, True])
+def test_router(last):
+    dut = Router(StreamSignature(16, last = last), OUTPUTS)
+    sent = {i: [] for i in range(OUTPUTS)}
+    received = {i: [] for i in range(OUTPUTS)}
+
+    async def source(ctx):
+        rnd = random.Random(0)
+
+        for k in range(BEATS):
+            while rnd.random() < 0.3:
+                ctx.set(dut.input.valid, 0)
+                await ctx.tick()
+
+            ctx.set(dut.input.data, k)
+
+            if last:
+                ctx.set(dut.input.last, k % 3 == 2)
+
+            ctx.set(dut.input.valid, 1)
+            await ctx.tick().until(dut.input.ready)
+
+        ctx.set(dut.input.valid, 0)
+
+    async def sink(ctx):
+        rnd = random.Random(1)
+        stalled = None
+        owner = None
+
+        while sum(len(values) for values in received.values()) < BEATS:
+            # Select changes every cycle, so a route that isn't held moves stalled beats.
+            ctx.set(dut.select, rnd.randrange(OUTPUTS))
+
+            for output in dut.outputs:
+                ctx.set(output.ready, rnd.random() < 0.4)
+
+            _, _, *samples = await ctx.tick().sample(
+                *(value for output in dut.outputs for value in (output.valid, output.ready, output.data, output.last if last else C(1))))
+
+            beats = [samples[i * 4:(i + 1) * 4] for i in range(OUTPUTS)]
+            active = [i for i, (valid, _, _, _) in enumerate(beats) if valid]
+
+            assert len(active) <= 1
+
+            # A stalled beat must stay on the same output until it's taken.
+            if stalled is not None:
+                i, data = stalled
+                assert active == [i] and beats[i][2] == data
+
+            stalled = None
+
+            for i in active:
+                valid, ready, data, end = beats[i]
+
+                if not ready:
+                    stalled = i, data
+                    continue
+
+                # A packet must go to a single output.
+                assert owner in (None, i)
+                owner = None if end else i
+
+                received[i].append(data)
+
+    sim = Simulator(dut)
+    sim.add_clock(1e-6)
+    sim.add_testbench(source, background = True)
+    sim.add_testbench(sink)
+    sim.run()
+
+    assert sorted(value for values in received.values() for value in values) == list(range(BEATS))
+    assert all(values == sorted(values) for values in received.values())
@@ -1,27 +1,88 @@
 import amaranth
 from amaranth.hdl import ir
-from amaranth.back import verilog
+from amaranth.lib import wiring
+from amaranth.back import rtlil, verilog
 
 import migen
 
+from litex.soc.interconnect import stream
+
+import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 from .platform import PlatformProxy
 
 __all__ = [
     'Glue',
+    'GlueGroup',
 ]
 
+@functools.cache
+def _toolchain_version():
+    # Cached Verilog is only valid for the Amaranth and Yosys versions that produced it.
+    yosys = verilog.find_yosys(lambda ver: True)
+    return f'amaranth {amaranth.__version__} yosys {yosys.version()}'
+
+class GlueGroup:
+    def __init__(self, *, max_workers = None):
+        self.max_workers = max_workers
+        self.glues = []
+        self.results = None
+
+    def add(self, glue):
+        assert self.results is None, 'Cannot add to a GlueGroup after it has been generated.'
+        self.glues.append(glue)
+
+    def generate(self):
+        # Elaboration stays in this process, since the name/direction maps refer to its signals.
+        # Only the Yosys step, which takes and returns plain text, runs in the pool.
+        self.results = {}
+        pending = {}
+
+        for glue in self.glues:
+            rtlil_text = glue.generate_rtlil()
+            v = glue.read_cache(rtlil_text)
+
+            if v is None:
+                pending[id(glue)] = glue, rtlil_text
+            else:
+                self.results[id(glue)] = v
+
+        if pending:
+            with ProcessPoolExecutor(max_workers = self.max_workers) as executor:
+                futures = {key: executor.submit(verilog._convert_rtlil_text, rtlil_text) for key, (glue, rtlil_text) in pending.items()}
+
+                for key, future in futures.items():
+                    glue, rtlil_text = pending[key]
+                    v = future.result()
+                    glue.write_cache(rtlil_text, v)
+                    self.results[key] = v
+
+    def generate_verilog(self, glue):
+        if self.results is None:
+            self.generate()
+
+        return self.results[id(glue)]
+
 class Glue(migen.Module):
-    def __init__(self, platform, name = 'amaranth_wrapper'):
+    def __init__(self, platform, name = 'amaranth_wrapper', *, cache = True, group = None, bus_io = False):
         self.platform = platform
         self.name = name
+        self.cache = cache
+        self.group = group
+        self.bus_io = bus_io
+
+        if group is not None:
+            group.add(self)
 
         self.m = amaranth.Module()
 
         self.platform_proxy = PlatformProxy(self)
 
         self.connections = []
+        self.domains = {}
 
     def connect(self, migen_sig, amaranth_sig, *, invert = False):
         self.connections.append((migen_sig, amaranth_sig, invert))
@@ -30,6 +91,7 @@ class Glue(migen.Module):
         n = 'sync' if name == 'sys' else name
 
         setattr(self.m.domains, n, amaranth.ClockDomain(n))
+        self.domains[n] = name
 
         self.connect(migen.ClockSignal(name), amaranth.ClockSignal(n))
         self.connect(migen.ResetSignal(name), amaranth.ResetSignal(n))
@@ -49,6 +111,80 @@ class Glue(migen.Module):
 
         return amaranth_sig
 
+    def _connect_stream_signal(self, amaranth_sig, flow, migen_value):
+        migen_sig = self.from_amaranth(amaranth_sig)
+
+        if flow == wiring.Out:
+            self.comb += migen_value.eq(migen_sig)
+        else:
+            self.comb += migen_sig.eq(migen_value)
+
+    def _connect_stream(self, endpoint, interface):
+        signature = interface.signature
+        flows = {name: member.flow for name, member in signature.members.items()}
+        names = ['valid', 'ready'] if signature.backpressure else ['valid']
+
+        # Without backpressure the Amaranth sink always accepts, so the LiteX source must not be left stalled.
+        if not signature.backpressure and flows['valid'] == wiring.In:
+            self.comb += endpoint.ready.eq(1)
+
+        if signature.lanes is None:
+            names += [name for name in ['data', 'first', 'last', 'keep'] if name in flows]
+
+            for name in names:
+                self._connect_stream_signal(getattr(interface, name), flows[name], getattr(endpoint, name))
+
+            return
+
+        for name in names:
+            self._connect_stream_signal(getattr(interface, name), flows[name], getattr(endpoint, name))
+
+        # Lanes are packed lane 0 first, matching wrap(). LiteX streams carry a single first/last,
+        # so the lane holding the last word is given by the one-hot last_be payload field.
+        width = len(interface.data[0])
+
+        for i in range(signature.lanes):
+            self._connect_stream_signal(interface.data[i], flows['data'], endpoint.data[i * width:(i + 1) * width])
+
+            if 'keep' in flows:
+                self._connect_stream_signal(interface.keep[i], flows['keep'], endpoint.keep[i])
+
+            if 'last' in flows:
+                if flows['last'] == wiring.Out:
+                    self._connect_stream_signal(interface.last[i], flows['last'], endpoint.last_be[i])
+                else:
+                    self._connect_stream_signal(interface.last[i], flows['last'], endpoint.last & endpoint.last_be[i])
+
+        if 'first' in flows:
+            self._connect_stream_signal(interface.first[0], flows['first'], endpoint.first)
+
+        if 'last' in flows and flows['last'] == wiring.Out:
+            self.comb += endpoint.last.eq(endpoint.last_be != 0)
+
+    def stream_layout(self, signature):
+        lanes = signature.lanes or 1
+        width = amaranth.Shape.cast(signature.members['data'].shape).width
+
+        layout = [('data', width * lanes)]
+
+        if signature.lanes is not None and 'last' in signature.members:
+            layout.append(('last_be', lanes))
+
+        if 'keep' in signature.members:
+            layout.append(('keep', lanes))
+
+        return layout
+
+    def to_litex_stream(self, interface):
+        endpoint = stream.Endpoint(self.stream_layout(interface.signature))
+        self._connect_stream(endpoint, interface)
+        return endpoint
+
+    def from_litex_stream(self, endpoint, signature, *, name = 'litex_stream'):
+        interface = signature.create(path = (name,))
+        self._connect_stream(endpoint, interface)
+        return interface
+
     def get_instance(self):
         connections = {}
 
@@ -68,14 +204,14 @@ class Glue(migen.Module):
 
         return migen.Instance(self.name, **connections)
 
-    def generate_verilog(self):
+    def generate_rtlil(self):
         fragment = ir.Fragment.get(self.m, self.platform_proxy)
         
         ports = [n for m, n, _ in self.connections]
 
         fragment = fragment.prepare(ports = ports)
 
-        v, m = verilog.convert_fragment(fragment, name = self.name)
+        rtlil_text, m = rtlil.convert_fragment(fragment, name = self.name)
 
         self.amaranth_dir_map = fragment.ports
         self.amaranth_name_map = m
@@ -90,13 +226,60 @@ class Glue(migen.Module):
             if domain.rst in self.amaranth_dir_map:
                 self.amaranth_dir_map[amaranth.ResetSignal(name)] = self.amaranth_dir_map[domain.rst]
 
+        return rtlil_text
+
+    def generate_verilog(self):
+        if self.group is not None:
+            return self.group.generate_verilog(self)
+
+        # RTLIL conversion is cheap and deterministic, so its output keys the cache for the expensive Yosys step.
+        rtlil_text = self.generate_rtlil()
+
+        v = self.read_cache(rtlil_text)
+
+        if v is None:
+            v = verilog._convert_rtlil_text(rtlil_text)
+            self.write_cache(rtlil_text, v)
+
         return v
 
+    def read_cache(self, rtlil_text):
+        cache_file = self.cache_file(rtlil_text)
+
+        if cache_file is not None and cache_file.exists():
+            return cache_file.read_text()
+
+    def write_cache(self, rtlil_text, v):
+        cache_file = self.cache_file(rtlil_text)
+
+        if cache_file is not None:
+            cache_file.parent.mkdir(parents = True, exist_ok = True)
+            cache_file.write_text(v)
+
+    def cache_file(self, rtlil_text):
+        output_dir = getattr(self.platform, 'output_dir', None)
+
+        if not self.cache or output_dir is None:
+            return None
+
+        h = hashlib.sha256(rtlil_text.encode())
+        h.update(f'{_toolchain_version()}\n'.encode())
+
+        for m, n, invert in self.connections:
+            h.update(f'{n!r} {invert}\n'.encode())
+
+        return Path(output_dir) / 'amaranth_cache' / f'{self.name}_{h.hexdigest()}.v'
+
     def do_finalize(self):
-        verilog_filename = str(Path(self.platform.output_dir) / 'gateware' / f'{self.name}.v')
+        verilog_path = Path(self.platform.output_dir) / 'gateware' / f'{self.name}.v'
+        verilog_filename = str(verilog_path)
+
+        v = self.generate_verilog()
 
-        with open(verilog_filename, 'w') as f:
-            f.write(self.generate_verilog())
+        # Leave the file untouched when nothing changed, so vendor tools don't see a new timestamp.
+        if not verilog_path.exists() or verilog_path.read_text() != v:
+            with open(verilog_filename, 'w') as f:
+                f.write(v)
 
         self.platform.add_source(verilog_filename)
 
@@ -4,8 +4,34 @@ from litex.build import io
 
 from amaranth.lib import wiring
 
+# LiteX's SDRInput/SDROutput only take single bits, and the vendor DDRInput/DDROutput lowerings instantiate a single-bit
+# primitive without splitting buses, so each bit gets its own special. Glue(bus_io = True) emits one DDR special per bus,
+# for platforms whose DDR lowering is known to accept buses.
+
+def _sdr_input(glue, i, o, clk):
+    for idx in range(len(i)):
+        glue.specials += io.SDRInput(i = i[idx], o = o[idx], clk = clk)
+
+def _sdr_output(glue, i, o, clk):
+    for idx in range(len(o)):
+        glue.specials += io.SDROutput(i = i[idx], o = o[idx], clk = clk)
+
+def _ddr_input(glue, i, o1, o2, clk):
+    if glue.bus_io:
+        glue.specials += io.DDRInput(i = i, o1 = o1, o2 = o2, clk = clk)
+    else:
+        for idx in range(len(i)):
+            glue.specials += io.DDRInput(i = i[idx], o1 = o1[idx], o2 = o2[idx], clk = clk)
+
+def _ddr_output(glue, i1, i2, o, clk):
+    if glue.bus_io:
+        glue.specials += io.DDROutput(i1 = i1, i2 = i2, o = o, clk = clk)
+    else:
+        for idx in range(len(o)):
+            glue.specials += io.DDROutput(i1 = i1[idx], i2 = i2[idx], o = o[idx], clk = clk)
+
 class PadsProxy:
-    def __init__(self, glue, name, migen_pads, dir, xdr):
+    def __init__(self, glue, name, migen_pads, dir, xdr, domain = None):
         signature_members = {}
 
         if isinstance(migen_pads, migen.Record):
@@ -23,7 +49,7 @@ class PadsProxy:
             assert isinstance(xdr, dict)
 
             for subname, *_ in migen_pads.layout:
-                subsignal = PadsProxy(glue, f'{name}_{subname}', getattr(migen_pads, subname), dir.get(subname), xdr.get(subname))
+                subsignal = PadsProxy(glue, f'{name}_{subname}', getattr(migen_pads, subname), dir.get(subname), xdr.get(subname), domain)
                 setattr(self, subname, subsignal)
                 signature_members[subname] = wiring.Out(subsignal.signature)
 
@@ -71,59 +97,45 @@ class PadsProxy:
             elif xdr == 1:
                 if dir == 'i':
                     i = migen.Signal.like(migen_pads)
-                    i_clk = migen.Signal()
-                    for idx in range(migen_pads.nbits):
-                        glue.specials += io.SDRInput(i = migen_pads[idx], o = i[idx], clk = i_clk)
+                    i_clk = self._clock(glue, name, 'i_clk', domain, signature_members)
+                    _sdr_input(glue, i = migen_pads, o = i, clk = i_clk)
                     self.i = glue.from_migen(i, name = f'{name}_i', invert = invert)
                     signature_members['i'] = wiring.Out(self.i.shape())
-                    self.i_clk = glue.from_migen(i_clk, name = f'{name}_i_clk')
-                    signature_members['i_clk'] = wiring.In(self.i_clk.shape())
                 elif dir == 'o':
                     o = migen.Signal.like(migen_pads)
-                    o_clk = migen.Signal()
-                    for idx in range(migen_pads.nbits):
-                        glue.specials += io.SDROutput(i = o[idx], o = migen_pads[idx], clk = o_clk)
+                    o_clk = self._clock(glue, name, 'o_clk', domain, signature_members)
+                    _sdr_output(glue, i = o, o = migen_pads, clk = o_clk)
                     self.o = glue.from_migen(o, name = f'{name}_o', invert = invert)
                     signature_members['o'] = wiring.In(self.o.shape())
-                    self.o_clk = glue.from_migen(o_clk, name = f'{name}_o_clk')
-                    signature_members['o_clk'] = wiring.In(self.o_clk.shape())
                 elif dir == 'io':
                     i = migen.Signal.like(migen_pads)
                     _i = migen.Signal.like(migen_pads)
                     o = migen.Signal.like(migen_pads)
                     _o = migen.Signal.like(migen_pads)
                     oe = migen.Signal()
-                    i_clk = migen.Signal()
-                    o_clk = migen.Signal()
+                    i_clk = self._clock(glue, name, 'i_clk', domain, signature_members)
+                    o_clk = self._clock(glue, name, 'o_clk', domain, signature_members)
                     glue.specials += io.Tristate(migen_pads, i = _i, o = _o, oe = migen.Replicate(oe, migen_pads.nbits))
-                    for idx in range(migen_pads.nbits):
-                        glue.specials += io.SDRInput(i = _i[idx], o = i[idx], clk = i_clk)
-                        glue.specials += io.SDROutput(i = o[idx], o = _o[idx], clk = o_clk)
+                    _sdr_input(glue, i = _i, o = i, clk = i_clk)
+                    _sdr_output(glue, i = o, o = _o, clk = o_clk)
                     self.i = glue.from_migen(i, name = f'{name}_i', invert = invert)
                     signature_members['i'] = wiring.Out(self.i.shape())
                     self.o = glue.from_migen(o, name = f'{name}_o', invert = invert)
                     signature_members['o'] = wiring.In(self.o.shape())
                     self.oe = glue.from_migen(oe, name = f'{name}_oe')
                     signature_members['oe'] = wiring.In(self.oe.shape())
-                    self.i_clk = glue.from_migen(i_clk, name = f'{name}_i_clk')
-                    signature_members['i_clk'] = wiring.In(self.i_clk.shape())
-                    self.o_clk = glue.from_migen(o_clk, name = f'{name}_o_clk')
-                    signature_members['o_clk'] = wiring.In(self.o_clk.shape())
                 elif dir == 'oe':
                     _i = migen.Signal.like(migen_pads)
                     o = migen.Signal.like(migen_pads)
                     _o = migen.Signal.like(migen_pads)
                     oe = migen.Signal()
-                    o_clk = migen.Signal()
+                    o_clk = self._clock(glue, name, 'o_clk', domain, signature_members)
                     glue.specials += io.Tristate(migen_pads, i = _i, o = _o, oe = migen.Replicate(oe, migen_pads.nbits))
-                    for idx in range(migen_pads.nbits):
-                        glue.specials += io.SDROutput(i = o[idx], o = _o[idx], clk = o_clk)
+                    _sdr_output(glue, i = o, o = _o, clk = o_clk)
                     self.o = glue.from_migen(o, name = f'{name}_o', invert = invert)
                     signature_members['o'] = wiring.In(self.o.shape())
                     self.oe = glue.from_migen(oe, name = f'{name}_oe')
                     signature_members['oe'] = wiring.In(self.oe.shape())
-                    self.o_clk = glue.from_migen(o_clk, name = f'{name}_o_clk')
-                    signature_members['o_clk'] = wiring.In(self.o_clk.shape())
                 else:
                     raise RuntimeError(f'{xdr=} and {dir=} not supported yet')
 
@@ -131,27 +143,63 @@ class PadsProxy:
                 if dir == 'i':
                     i0 = migen.Signal.like(migen_pads)
                     i1 = migen.Signal.like(migen_pads)
-                    i_clk = migen.Signal()
-                    for idx in range(migen_pads.nbits):
-                        glue.specials += io.DDRInput(i = migen_pads[idx], o1 = i0[idx], o2 = i1[idx], clk = i_clk)
+                    i_clk = self._clock(glue, name, 'i_clk', domain, signature_members)
+                    _ddr_input(glue, i = migen_pads, o1 = i0, o2 = i1, clk = i_clk)
                     self.i0 = glue.from_migen(i0, name = f'{name}_i0', invert = invert)
                     self.i1 = glue.from_migen(i1, name = f'{name}_i1', invert = invert)
                     signature_members['i0'] = wiring.Out(self.i0.shape())
                     signature_members['i1'] = wiring.Out(self.i1.shape())
-                    self.i_clk = glue.from_migen(i_clk, name = f'{name}_i_clk')
-                    signature_members['i_clk'] = wiring.In(self.i_clk.shape())
                 elif dir == 'o':
                     o0 = migen.Signal.like(migen_pads)
                     o1 = migen.Signal.like(migen_pads)
-                    o_clk = migen.Signal()
-                    for idx in range(migen_pads.nbits):
-                        glue.specials += io.DDROutput(i1 = o0[idx], i2 = o1[idx], o = migen_pads[idx], clk = o_clk)
+                    o_clk = self._clock(glue, name, 'o_clk', domain, signature_members)
+                    _ddr_output(glue, i1 = o0, i2 = o1, o = migen_pads, clk = o_clk)
+                    self.o0 = glue.from_migen(o0, name = f'{name}_o0', invert = invert)
+                    self.o1 = glue.from_migen(o1, name = f'{name}_o1', invert = invert)
+                    signature_members['o0'] = wiring.In(self.o0.shape())
+                    signature_members['o1'] = wiring.In(self.o1.shape())
+                elif dir == 'io':
+                    i0 = migen.Signal.like(migen_pads)
+                    i1 = migen.Signal.like(migen_pads)
+                    _i = migen.Signal.like(migen_pads)
+                    o0 = migen.Signal.like(migen_pads)
+                    o1 = migen.Signal.like(migen_pads)
+                    _o = migen.Signal.like(migen_pads)
+                    oe = migen.Signal()
+                    _oe = migen.Signal()
+                    i_clk = self._clock(glue, name, 'i_clk', domain, signature_members)
+                    o_clk = self._clock(glue, name, 'o_clk', domain, signature_members)
+                    glue.specials += io.Tristate(migen_pads, i = _i, o = _o, oe = migen.Replicate(_oe, migen_pads.nbits))
+                    _ddr_input(glue, i = _i, o1 = i0, o2 = i1, clk = i_clk)
+                    _ddr_output(glue, i1 = o0, i2 = o1, o = _o, clk = o_clk)
+                    _sdr_output(glue, i = oe, o = _oe, clk = o_clk)
+                    self.i0 = glue.from_migen(i0, name = f'{name}_i0', invert = invert)
+                    self.i1 = glue.from_migen(i1, name = f'{name}_i1', invert = invert)
+                    signature_members['i0'] = wiring.Out(self.i0.shape())
+                    signature_members['i1'] = wiring.Out(self.i1.shape())
                     self.o0 = glue.from_migen(o0, name = f'{name}_o0', invert = invert)
                     self.o1 = glue.from_migen(o1, name = f'{name}_o1', invert = invert)
                     signature_members['o0'] = wiring.In(self.o0.shape())
                     signature_members['o1'] = wiring.In(self.o1.shape())
-                    self.o_clk = glue.from_migen(o_clk, name = f'{name}_o_clk')
-                    signature_members['o_clk'] = wiring.In(self.o_clk.shape())
+                    self.oe = glue.from_migen(oe, name = f'{name}_oe')
+                    signature_members['oe'] = wiring.In(self.oe.shape())
+                elif dir == 'oe':
+                    _i = migen.Signal.like(migen_pads)
+                    o0 = migen.Signal.like(migen_pads)
+                    o1 = migen.Signal.like(migen_pads)
+                    _o = migen.Signal.like(migen_pads)
+                    oe = migen.Signal()
+                    _oe = migen.Signal()
+                    o_clk = self._clock(glue, name, 'o_clk', domain, signature_members)
+                    glue.specials += io.Tristate(migen_pads, i = _i, o = _o, oe = migen.Replicate(_oe, migen_pads.nbits))
+                    _ddr_output(glue, i1 = o0, i2 = o1, o = _o, clk = o_clk)
+                    _sdr_output(glue, i = oe, o = _oe, clk = o_clk)
+                    self.o0 = glue.from_migen(o0, name = f'{name}_o0', invert = invert)
+                    self.o1 = glue.from_migen(o1, name = f'{name}_o1', invert = invert)
+                    signature_members['o0'] = wiring.In(self.o0.shape())
+                    signature_members['o1'] = wiring.In(self.o1.shape())
+                    self.oe = glue.from_migen(oe, name = f'{name}_oe')
+                    signature_members['oe'] = wiring.In(self.oe.shape())
                 else:
                     raise RuntimeError(f'{xdr=} and {dir=} not supported yet')
 
@@ -161,6 +209,16 @@ class PadsProxy:
         self.signature = wiring.Signature(signature_members)
         assert self.signature.is_compliant(self)
 
+    def _clock(self, glue, name, attr, domain, signature_members):
+        # Pads clocked from a glue domain share its clock net, instead of each getting a clock port driven from Amaranth.
+        if domain is not None:
+            return migen.ClockSignal(glue.domains[domain])
+
+        clk = migen.Signal()
+        setattr(self, attr, glue.from_migen(clk, name = f'{name}_{attr}'))
+        signature_members[attr] = wiring.In(1)
+        return clk
+
     def __str__(self):
         return f'<PadsProxy: {self.signature}>'
 
@@ -168,13 +226,13 @@ class PlatformProxy:
     def __init__(self, glue):
         self.glue = glue
 
-    def request(self, name, number = None, *, dir = None, xdr = None):
+    def request(self, name, number = None, *, dir = None, xdr = None, domain = None):
         migen_pads = self.glue.platform.request(name, number)
 
         if number is not None:
             name = f'{name}_{number}'
 
-        return PadsProxy(self.glue, f'pad_{name}', migen_pads, dir, xdr)
+        return PadsProxy(self.glue, f'pad_{name}', migen_pads, dir, xdr, domain)
 
     @property
     def device(self):
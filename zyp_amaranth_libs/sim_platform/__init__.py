@@ -1,33 +1,56 @@
+from amaranth import Cat
 from amaranth.build.res import ResourceManager
 
+import itertools
+
 __all__ = [
     'SimPlatform',
 ]
 
 class SimPort:
-    def __init__(self, sim, pin, port, attrs, invert):
+    def __init__(self, pin, port, attrs, invert):
         self.pin = pin
         self.port = port
         self.attrs = attrs
         self.invert = (2 << len(port)) - 1 if invert else 0
 
-        if pin.xdr == 0:
-            if 'i' in pin.dir:
-                sim.add_process(self.in_xdr0, passive = True)
-            if 'o' in pin.dir:
-                sim.add_process(self.out_xdr0, passive = True)
+        self.i_d0 = 0
+        self.i_d1 = 0
+        self.o_d0 = (0, 0)
+        self.o_d1 = (0, 0)
+        self.o_pending = 0
+        self.o_oe = (0, 0)
+        self.o_enable = 1
+
+        self.source = None
+        self.sink = None
+
+    @property
+    def name(self):
+        return self.port.name
+
+    async def read_pad(self, value):
+        # Replaces the value read from the pad with the next one from the source, while it has any.
+        if self.source is not None:
+            source_value = self.source.next(self)
+
+            if source_value is not None:
+                await self.port.io.set(source_value)
+                return source_value
+
+            self.source = None
+
+        return value
 
-        elif pin.xdr == 1:
-            if 'i' in pin.dir:
-                sim.add_process(self.in_xdr1, passive = True)
-            if 'o' in pin.dir:
-                sim.add_process(self.out_xdr1, passive = True)
+    async def write_pad(self, value, enable = True):
+        # An undriven pad is still recorded, with whatever is on it, so the sink stays aligned with the clock.
+        if enable:
+            await self.port.io.set(value)
+        else:
+            value = await self.port.io.get()
 
-        elif pin.xdr == 2:
-            if 'i' in pin.dir:
-                sim.add_process(self.in_xdr2, passive = True)
-            if 'o' in pin.dir:
-                sim.add_process(self.out_xdr2, passive = True)
+        if self.sink is not None:
+            self.sink.append(self, value)
 
     async def in_xdr0(self, sim):
         while True:
@@ -41,41 +64,170 @@ class SimPort:
             value = await self.pin.o.get()
             await self.port.io.set(value ^ self.invert)
 
-    async def in_xdr1(self, sim):
-        while True:
-            await sim.changed(self.pin.i_clk, 1)
-            value = await self.port.io.get()
-            await self.pin.i.set(value ^ self.invert)
+class SimGroup:
+    # Clocked pins of one xdr mode and direction that changed clock together, handled with one read and write per edge.
+    def __init__(self, ports, xdr, dir):
+        self.ports = ports
+        self.xdr = xdr
+        self.dir = dir
 
-    async def out_xdr1(self, sim):
-        while True:
-            await sim.changed(self.pin.o_clk, 1)
-            value = await self.pin.o.get()
-            await self.port.io.set(value ^ self.invert)
+        widths = [len(port.port) for port in ports]
+        self.offsets = list(itertools.accumulate(widths, initial = 0))[:-1]
+        self.masks = [(1 << width) - 1 for width in widths]
+        self.invert = self.merge(port.invert & mask for port, mask in zip(ports, self.masks))
+
+        self.pads = Cat(port.port.io for port in ports)
+
+        if dir == 'i' and xdr == 1:
+            self.i = Cat(port.pin.i for port in ports)
+        elif dir == 'i':
+            self.i0 = Cat(port.pin.i0 for port in ports)
+            self.i1 = Cat(port.pin.i1 for port in ports)
+        elif xdr == 1:
+            self.o = Cat(port.pin.o for port in ports)
+        else:
+            self.o0 = Cat(port.pin.o0 for port in ports)
+            self.o1 = Cat(port.pin.o1 for port in ports)
+            self.oe_ports = [port for port in ports if port.pin.dir in ('io', 'oe')]
+            self.oe = Cat(port.pin.oe for port in self.oe_ports)
+
+    def split(self, value):
+        return [value >> offset & mask for offset, mask in zip(self.offsets, self.masks)]
+
+    def merge(self, values):
+        return sum(value << offset for value, offset in zip(values, self.offsets))
+
+    async def read_pads(self):
+        values = self.split(await self.pads.get())
+
+        for idx, port in enumerate(self.ports):
+            if port.source is not None:
+                values[idx] = await port.read_pad(values[idx])
+
+        return values
+
+    async def write_pads(self, values, enables = None):
+        if enables is None and all(port.sink is None for port in self.ports):
+            await self.pads.set(self.merge(values))
+            return
+
+        for idx, port in enumerate(self.ports):
+            await port.write_pad(values[idx], True if enables is None else enables[idx])
+
+    async def edge(self, clk):
+        await getattr(self, f'{self.dir}_xdr{self.xdr}')(clk)
+
+    async def i_xdr1(self, clk):
+        if clk:
+            await self.i.set(self.merge(await self.read_pads()) ^ self.invert)
+
+    async def o_xdr1(self, clk):
+        if clk:
+            await self.write_pads(self.split(await self.o.get() ^ self.invert))
+
+    async def i_xdr2(self, clk):
+        values = await self.read_pads()
+
+        if clk:
+            i0 = [port.i_d0 for port in self.ports]
+            i1 = [port.i_d1 for port in self.ports]
+
+            for port, value in zip(self.ports, values):
+                port.i_d0 = value
+
+            await self.i0.set(self.merge(i0) ^ self.invert)
+            await self.i1.set(self.merge(i1) ^ self.invert)
+        else:
+            for port, value in zip(self.ports, values):
+                port.i_d1 = value
+
+    async def o_xdr2(self, clk):
+        if clk:
+            o0 = self.split(await self.o0.get())
+            o1 = self.split(await self.o1.get())
+            oe = await self.oe.get() if self.oe_ports else 0
+            values = []
+
+            for port, d0, d1 in zip(self.ports, o0, o1):
+                value, *port.o_d0 = *port.o_d0, d0
+                port.o_pending, *port.o_d1 = *port.o_d1, d1
+                values.append(value)
+
+            # The output enable is registered alongside the data, and the pad is left undriven while it's low.
+            for idx, port in enumerate(self.oe_ports):
+                port.o_enable, *port.o_oe = *port.o_oe, oe >> idx & 1
+        else:
+            values = [port.o_pending for port in self.ports]
+
+        enables = [port.o_enable for port in self.ports]
+        values = self.split(self.merge(values) ^ self.invert)
+
+        await self.write_pads(values, None if all(enables) else enables)
+
+class SimBank:
+    # Runs every clocked pin from one process; the pins whose clocks changed together are handled as groups.
+    def __init__(self, sim, entries):
+        self.entries = entries
+        self.clocks = [port.pin.i_clk if dir == 'i' else port.pin.o_clk for port, dir in entries]
+        self.groups = {}
+
+        sim.add_process(self.process, passive = True)
+
+    def get_groups(self, changed, value):
+        key = changed, value & changed
+
+        if key not in self.groups:
+            members = {}
+
+            for idx, (port, dir) in enumerate(self.entries):
+                if changed >> idx & 1:
+                    members.setdefault((port.pin.xdr, dir, value >> idx & 1), []).append(port)
+
+            self.groups[key] = [(SimGroup(ports, xdr, dir), clk) for (xdr, dir, clk), ports in members.items()]
+
+        return self.groups[key]
+
+    async def process(self, sim):
+        clocks = Cat(*self.clocks)
+        previous = await clocks.get()
 
-    async def in_xdr2(self, sim):
-        d0 = 0
-        d1 = 0
-        while True:
-            await sim.changed(self.pin.i_clk, 1)
-            value, d0 = d0, await self.port.io.get()
-            await self.pin.i0.set(value ^ self.invert)
-            await self.pin.i1.set(d1 ^ self.invert)
-            await sim.changed(self.pin.i_clk, 0)
-            d1 = await self.port.io.get()
-
-    async def out_xdr2(self, sim):
-        d0 = (0, 0)
-        d1 = (0, 0)
         while True:
-            await sim.changed(self.pin.o_clk, 1)
-            value, *d0 = *d0, await self.pin.o0.get()
-            await self.port.io.set(value ^ self.invert)
-            value, *d1 = *d1, await self.pin.o1.get()
-            await sim.changed(self.pin.o_clk, 0)
-            await self.port.io.set(value ^ self.invert)
+            await sim.changed(*self.clocks)
+
+            value = await clocks.get()
+            changed, previous = value ^ previous, value
+
+            for group, clk in self.get_groups(changed, value):
+                await group.edge(clk)
 
 class SimPlatform(ResourceManager):
+    def sim_ports(self, name, number = 0):
+        prefix = f'{name}_{number}'
+        return sorted(
+            (port for port in self._sim_ports if port.name == prefix or port.name.startswith(f'{prefix}__')),
+            key = lambda port: port.name,
+        )
+
     def prepare(self, sim):
+        self._sim_ports = []
+        entries = []
+
         for pin, port, attrs, invert in self.iter_single_ended_pins():
-            SimPort(sim, pin, port, attrs, invert)
+            if len(port) == 0 or pin.xdr not in (0, 1, 2):
+                continue
+
+            sim_port = SimPort(pin, port, attrs, invert)
+            self._sim_ports.append(sim_port)
+
+            for dir in 'io':
+                if dir not in pin.dir:
+                    continue
+
+                # Unclocked pins wait on their own signal, so they cost nothing while idle.
+                if pin.xdr == 0:
+                    sim.add_process(sim_port.in_xdr0 if dir == 'i' else sim_port.out_xdr0, passive = True)
+                else:
+                    entries.append((sim_port, dir))
+
+        if entries:
+            SimBank(sim, entries)
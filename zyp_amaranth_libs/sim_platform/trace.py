@@ -0,0 +1,104 @@
+import numpy as np
+
+__all__ = [
+    'SimRecorder',
+    'SimPlayer',
+]
+
+class _Trace:
+    def __init__(self, ports):
+        self.ports = ports
+
+        # Clocked ports contribute one column per data phase; xdr=2 ports sample both clock edges.
+        self.columns = []
+        self.base = {}
+        self.phases = {}
+        self.position = {}
+
+        for port in ports:
+            phases = 2 if port.pin.xdr == 2 else 1
+
+            self.base[id(port)] = len(self.columns)
+            self.phases[id(port)] = phases
+            self.position[id(port)] = 0
+
+            self.columns.extend((port.name, phase) for phase in range(phases))
+
+        width = max((len(port.port) for port in ports), default = 1)
+        assert width <= 64, 'Trace ports wider than 64 bits are not supported.'
+
+        self.dtype = np.min_scalar_type((1 << width) - 1)
+
+    def index(self, port):
+        idx = self.position[id(port)]
+        self.position[id(port)] = idx + 1
+
+        phases = self.phases[id(port)]
+        return idx // phases, self.base[id(port)] + idx % phases
+
+class SimRecorder(_Trace):
+    def __init__(self, sim, platform, name, number = 0, *, filename, cycles, domain = 'sync'):
+        super().__init__([port for port in platform.sim_ports(name, number) if 'o' in port.pin.dir])
+
+        self.domain = domain
+        self.trace = np.lib.format.open_memmap(filename, mode = 'w+', dtype = self.dtype, shape = (cycles, len(self.columns)))
+
+        for port in self.ports:
+            if port.pin.xdr != 0:
+                port.sink = self
+
+        if any(port.pin.xdr == 0 for port in self.ports):
+            sim.add_process(self.process, passive = True)
+
+    def append(self, port, value):
+        row, column = self.index(port)
+
+        if row < len(self.trace):
+            self.trace[row, column] = value
+
+    async def process(self, sim):
+        ports = [port for port in self.ports if port.pin.xdr == 0]
+
+        while True:
+            await sim.tick(self.domain)
+
+            for port in ports:
+                self.append(port, await port.port.io.get())
+
+    def close(self):
+        for port in self.ports:
+            if port.sink is self:
+                port.sink = None
+
+        self.trace.flush()
+
+class SimPlayer(_Trace):
+    def __init__(self, sim, platform, name, number = 0, *, filename, domain = 'sync'):
+        super().__init__([port for port in platform.sim_ports(name, number) if 'i' in port.pin.dir])
+
+        self.domain = domain
+        self.trace = np.load(filename, mmap_mode = 'r')
+
+        assert self.trace.ndim == 2 and self.trace.shape[1] == len(self.columns)
+
+        for port in self.ports:
+            if port.pin.xdr != 0:
+                port.source = self
+
+        if any(port.pin.xdr == 0 for port in self.ports):
+            sim.add_process(self.process, passive = True)
+
+    def next(self, port):
+        row, column = self.index(port)
+
+        if row < len(self.trace):
+            return int(self.trace[row, column])
+
+    async def process(self, sim):
+        ports = [port for port in self.ports if port.pin.xdr == 0]
+
+        for _ in range(len(self.trace)):
+            await sim.tick(self.domain)
+
+            for port in ports:
+                await port.port.io.set(self.next(port))
@@ -1,2 +1,4 @@
 from .interface import *
 from .components import *
+from .monitor import *
+from .schedule import *
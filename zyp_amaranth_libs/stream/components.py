@@ -1,12 +1,33 @@
 from amaranth import *
-from amaranth.lib.wiring import Component, In, Out
+from amaranth.lib.wiring import Component, In, Out, connect, flipped
+from amaranth.lib.fifo import SyncFIFOBuffered, AsyncFIFOBuffered
+from amaranth.utils import ceil_log2
 
 __all__ = [
     'Buffer',
+    'SkidBuffer',
+    'FIFO',
+    'AsyncFIFO',
+    'LaneConverter',
+    'LaneCompactor',
+    'Arbiter',
+    'Router',
+    'Fork',
+    'ReverseBuffer',
+    'Pipeline',
 ]
 
+def _lanes(interface, name):
+    if interface.signature.lanes is None:
+        return [getattr(interface, name)]
+    else:
+        return list(getattr(interface, name))
+
 class Buffer(Component):
     def __init__(self, stream_signature):
+        self.latency = 1
+        self.registered_ready = False
+
         super().__init__({
             'input': In(stream_signature),
             'output': Out(stream_signature),
@@ -26,3 +47,570 @@ class Buffer(Component):
                 m.d.sync += self.output.wrap().eq(self.input.wrap())
 
         return m
+
+class SkidBuffer(Component):
+    def __init__(self, stream_signature):
+        self.latency = 1
+        self.registered_ready = True
+
+        super().__init__({
+            'input': In(stream_signature),
+            'output': Out(stream_signature),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        skid = Signal(len(self.input.wrap()))
+        skid_valid = Signal()
+
+        m.d.comb += self.input.ready.eq(~skid_valid)
+
+        with m.If(self.output.valid & self.output.ready):
+            m.d.sync += self.output.valid.eq(0)
+
+        with m.If(~self.output.valid | self.output.ready):
+            with m.If(skid_valid):
+                m.d.sync += self.output.valid.eq(1)
+                m.d.sync += self.output.wrap().eq(skid)
+                m.d.sync += skid_valid.eq(0)
+
+            with m.Elif(self.input.valid):
+                m.d.sync += self.output.valid.eq(1)
+                m.d.sync += self.output.wrap().eq(self.input.wrap())
+
+        with m.Elif(self.input.valid & ~skid_valid):
+            m.d.sync += skid_valid.eq(1)
+            m.d.sync += skid.eq(self.input.wrap())
+
+        return m
+
+class FIFO(Component):
+    def __init__(self, stream_signature, depth, *, packet = False, almost_full = None, almost_empty = None):
+        assert depth > 0
+
+        if packet:
+            assert 'last' in stream_signature.members
+
+        # SyncFIFOBuffered only sustains one beat per clock from a depth of 3.
+        depth = max(depth, 3)
+
+        self.depth = depth
+        self.packet = packet
+        self.almost_full_level = depth - 1 if almost_full is None else almost_full
+        self.almost_empty_level = 1 if almost_empty is None else almost_empty
+
+        self.latency = 2
+        self.registered_ready = True
+
+        super().__init__({
+            'input': In(stream_signature),
+            'output': Out(stream_signature),
+            'level': Out(range(depth + 1)),
+            'almost_full': Out(1),
+            'almost_empty': Out(1),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        m.submodules.fifo = fifo = SyncFIFOBuffered(width = len(self.input.wrap()), depth = self.depth)
+
+        m.d.comb += [
+            fifo.w_data.eq(self.input.wrap()),
+            fifo.w_en.eq(self.input.valid),
+            self.input.ready.eq(fifo.w_rdy),
+
+            self.output.wrap().eq(fifo.r_data),
+
+            self.level.eq(fifo.level),
+            self.almost_full.eq(fifo.level >= self.almost_full_level),
+            self.almost_empty.eq(fifo.level <= self.almost_empty_level),
+        ]
+
+        if self.packet:
+            # Number of complete packets held. Output is only released once a whole packet is stored,
+            # so depth must be at least the longest packet.
+            packets = Signal(range(self.depth + 1))
+
+            input_last = self.input.valid & self.input.ready & Cat(self.input.last).any()
+            output_last = self.output.valid & self.output.ready & Cat(self.output.last).any()
+
+            m.d.sync += packets.eq(packets + input_last - output_last)
+
+            m.d.comb += [
+                self.output.valid.eq(fifo.r_rdy & (packets != 0)),
+                fifo.r_en.eq(self.output.ready & (packets != 0)),
+            ]
+
+        else:
+            m.d.comb += [
+                self.output.valid.eq(fifo.r_rdy),
+                fifo.r_en.eq(self.output.ready),
+            ]
+
+        return m
+
+class AsyncFIFO(Component):
+    def __init__(self, stream_signature, depth, *, w_domain, r_domain):
+        assert depth > 0
+
+        # AsyncFIFOBuffered only supports depths of a power of two plus one, and at least 3.
+        self.depth = (1 << ceil_log2(max(depth, 3) - 1)) + 1
+        self.w_domain = w_domain
+        self.r_domain = r_domain
+
+        self.latency = None
+        self.registered_ready = True
+
+        super().__init__({
+            'input': In(stream_signature),
+            'output': Out(stream_signature),
+            'w_level': Out(range(self.depth + 1)),
+            'r_level': Out(range(self.depth + 1)),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        m.submodules.fifo = fifo = AsyncFIFOBuffered(
+            width = len(self.input.wrap()),
+            depth = self.depth,
+            w_domain = self.w_domain,
+            r_domain = self.r_domain,
+        )
+
+        m.d.comb += [
+            fifo.w_data.eq(self.input.wrap()),
+            fifo.w_en.eq(self.input.valid),
+            self.input.ready.eq(fifo.w_rdy),
+            self.w_level.eq(fifo.w_level),
+
+            self.output.wrap().eq(fifo.r_data),
+            self.output.valid.eq(fifo.r_rdy),
+            fifo.r_en.eq(self.output.ready),
+            self.r_level.eq(fifo.r_level),
+        ]
+
+        return m
+
+class LaneConverter(Component):
+    def __init__(self, input_signature, output_signature):
+        self.input_lanes = input_signature.lanes or 1
+        self.output_lanes = output_signature.lanes or 1
+
+        assert max(self.input_lanes, self.output_lanes) % min(self.input_lanes, self.output_lanes) == 0
+        assert set(input_signature.members.keys()) == set(output_signature.members.keys())
+
+        self.latency = 1 if self.output_lanes > self.input_lanes else 0
+        self.registered_ready = False
+
+        super().__init__({
+            'input': In(input_signature),
+            'output': Out(output_signature),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        names = [name for name in ['data', 'first', 'last', 'keep'] if name in self.input.signature.members]
+
+        if self.input_lanes == self.output_lanes:
+            for name in names:
+                for i, o in zip(_lanes(self.input, name), _lanes(self.output, name)):
+                    m.d.comb += o.eq(i)
+
+            m.d.comb += [
+                self.output.valid.eq(self.input.valid),
+                self.input.ready.eq(self.output.ready),
+            ]
+
+        elif self.input_lanes > self.output_lanes:
+            ratio = self.input_lanes // self.output_lanes
+            index = Signal(range(ratio))
+
+            m.d.comb += self.output.valid.eq(self.input.valid)
+
+            with m.Switch(index):
+                for n in range(ratio):
+                    with m.Case(n):
+                        lanes = slice(n * self.output_lanes, (n + 1) * self.output_lanes)
+
+                        for name in names:
+                            for i, o in zip(_lanes(self.input, name)[lanes], _lanes(self.output, name)):
+                                m.d.comb += o.eq(i)
+
+                        # Release the input beat after its final part, or early if the packet ends in this part.
+                        if n == ratio - 1:
+                            end = C(1)
+                        elif 'last' in names:
+                            end = Cat(_lanes(self.input, 'last')[lanes]).any()
+                        else:
+                            end = C(0)
+
+                        m.d.comb += self.input.ready.eq(self.output.ready & end)
+
+            with m.If(self.output.valid & self.output.ready):
+                m.d.sync += index.eq(Mux(self.input.ready, 0, index + 1))
+
+        else:
+            ratio = self.output_lanes // self.input_lanes
+            index = Signal(range(ratio))
+
+            with m.If(self.output.valid & self.output.ready):
+                m.d.sync += self.output.valid.eq(0)
+
+            with m.If(~self.output.valid | self.output.ready):
+                m.d.comb += self.input.ready.eq(1)
+
+                with m.If(self.input.valid):
+                    with m.Switch(index):
+                        for n in range(ratio):
+                            with m.Case(n):
+                                lanes = slice(n * self.input_lanes, (n + 1) * self.input_lanes)
+
+                                for name in names:
+                                    outputs = _lanes(self.output, name)
+
+                                    for i, o in zip(_lanes(self.input, name), outputs[lanes]):
+                                        m.d.sync += o.eq(i)
+
+                                    # Clear flags left over from the previous output beat.
+                                    if n == 0 and name != 'data':
+                                        for o in outputs[self.input_lanes:]:
+                                            m.d.sync += o.eq(0)
+
+                    end = index == ratio - 1
+
+                    if 'last' in names:
+                        end |= Cat(_lanes(self.input, 'last')).any()
+
+                    with m.If(end):
+                        m.d.sync += self.output.valid.eq(1)
+                        m.d.sync += index.eq(0)
+
+                    with m.Else():
+                        m.d.sync += index.eq(index + 1)
+
+        return m
+
+class LaneCompactor(Component):
+    def __init__(self, stream_signature):
+        assert stream_signature.lanes is not None
+        assert 'keep' in stream_signature.members
+
+        self.latency = 1
+        self.registered_ready = False
+
+        super().__init__({
+            'input': In(stream_signature),
+            'output': Out(stream_signature),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        lanes = self.input.signature.lanes
+        has_first = 'first' in self.input.signature.members
+        has_last = 'last' in self.input.signature.members
+
+        # Two beats worth of lanes; the first holds the next output beat, the second any overflow.
+        buf_data = [Signal.like(self.input.data[0], name = f'buf_data_{i}') for i in range(2 * lanes)]
+        buf_first = [Signal(name = f'buf_first_{i}') for i in range(2 * lanes)]
+        count = Signal(range(2 * lanes))
+        flush = Signal()
+
+        # A packet ending in a beat with no lanes left over is terminated by a beat with no kept lanes.
+        empty = flush & (count == 0)
+
+        # A first flag on a beat with no kept lanes is carried over to the next kept lane.
+        pending_first = Signal()
+
+        m.d.comb += self.output.valid.eq((count >= lanes) | flush)
+
+        for i in range(lanes):
+            m.d.comb += self.output.data[i].eq(buf_data[i])
+            m.d.comb += self.output.keep[i].eq(i < count)
+
+            if has_first:
+                m.d.comb += self.output.first[i].eq(buf_first[i] & (i < count))
+
+            if has_last:
+                m.d.comb += self.output.last[i].eq(flush & (count == i + 1))
+
+        if has_first:
+            m.d.comb += self.output.first[0].eq((buf_first[0] & (count != 0)) | (empty & pending_first))
+
+        if has_last:
+            m.d.comb += self.output.last[0].eq(flush & (count <= 1))
+
+        fire = self.output.valid & self.output.ready
+        remaining = Mux(fire, Mux(count > lanes, count - lanes, 0), count)
+
+        with m.If(flush):
+            m.d.comb += self.input.ready.eq((count <= lanes) & self.output.ready)
+        with m.Else():
+            m.d.comb += self.input.ready.eq((count < lanes) | self.output.ready)
+
+        accept = self.input.valid & self.input.ready
+
+        with m.If(fire):
+            for i in range(lanes):
+                m.d.sync += buf_data[i].eq(buf_data[i + lanes])
+                m.d.sync += buf_first[i].eq(buf_first[i + lanes])
+
+            with m.If(count <= lanes):
+                m.d.sync += flush.eq(0)
+
+            with m.If(empty):
+                m.d.sync += pending_first.eq(0)
+
+        m.d.sync += count.eq(remaining)
+
+        with m.If(accept):
+            position = remaining
+            beat_first = Signal()
+
+            if has_first:
+                m.d.comb += beat_first.eq(Cat(self.input.first).any() | pending_first)
+                m.d.sync += pending_first.eq(beat_first & ~Cat(self.input.keep).any())
+
+            for i in range(lanes):
+                target = Signal(range(2 * lanes), name = f'target_{i}')
+                m.d.comb += target.eq(position)
+
+                with m.If(self.input.keep[i]):
+                    with m.Switch(target):
+                        for j in range(2 * lanes):
+                            with m.Case(j):
+                                m.d.sync += buf_data[j].eq(self.input.data[i])
+                                m.d.sync += buf_first[j].eq(beat_first & (target == remaining))
+
+                position = position + self.input.keep[i]
+
+            m.d.sync += count.eq(position)
+
+            if has_last:
+                m.d.sync += flush.eq(Cat(self.input.last).any())
+
+        return m
+
+class Arbiter(Component):
+    def __init__(self, stream_signature, n, *, policy = 'round-robin'):
+        assert policy in ('round-robin', 'priority')
+
+        self.n = n
+        self.policy = policy
+
+        super().__init__({
+            'inputs': In(stream_signature).array(n),
+            'output': Out(stream_signature),
+        })
+
+    def _select(self, m, selected, order):
+        order = list(order)
+
+        # Assigned in reverse, so the first valid input in order wins.
+        m.d.comb += selected.eq(order[0])
+
+        for i in reversed(order):
+            with m.If(self.inputs[i].valid):
+                m.d.comb += selected.eq(i)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        grant = Signal(range(self.n))
+        locked = Signal()
+        selected = Signal(range(self.n))
+
+        with m.If(locked):
+            m.d.comb += selected.eq(grant)
+
+        with m.Else():
+            if self.policy == 'priority':
+                self._select(m, selected, range(self.n))
+
+            else:
+                with m.Switch(grant):
+                    for g in range(self.n):
+                        with m.Case(g):
+                            self._select(m, selected, [(g + 1 + i) % self.n for i in range(self.n)])
+
+        with m.Switch(selected):
+            for i, input in enumerate(self.inputs):
+                with m.Case(i):
+                    m.d.comb += [
+                        self.output.wrap().eq(input.wrap()),
+                        self.output.valid.eq(input.valid),
+                        input.ready.eq(self.output.ready),
+                    ]
+
+        end = Cat(self.output.last).any() if 'last' in self.output.signature.members else C(1)
+
+        # The grant is held through a packet, and through a stalled beat so it can't be replaced before it's taken.
+        with m.If(self.output.valid):
+            m.d.sync += grant.eq(selected)
+            m.d.sync += locked.eq(~self.output.ready | ~end)
+
+        return m
+
+class Router(Component):
+    def __init__(self, stream_signature, n):
+        self.n = n
+
+        super().__init__({
+            'input': In(stream_signature),
+            'outputs': Out(stream_signature).array(n),
+            'select': In(range(n)),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        held = Signal(range(self.n))
+        locked = Signal()
+        route = Mux(locked, held, self.select)
+
+        for i, output in enumerate(self.outputs):
+            m.d.comb += output.wrap().eq(self.input.wrap())
+
+            with m.If(route == i):
+                m.d.comb += [
+                    output.valid.eq(self.input.valid),
+                    self.input.ready.eq(output.ready),
+                ]
+
+        end = Cat(self.input.last).any() if 'last' in self.input.signature.members else C(1)
+
+        # The route is held through a packet, and through a stalled beat so it can't be moved before it's taken.
+        with m.If(self.input.valid):
+            m.d.sync += held.eq(route)
+            m.d.sync += locked.eq(~self.input.ready | ~end)
+
+        return m
+
+class Fork(Component):
+    def __init__(self, stream_signature, n, *, depth = 0):
+        assert n > 0
+
+        if isinstance(depth, int):
+            depth = [depth] * n
+
+        assert len(depth) == n
+
+        self.n = n
+        self.depth = depth
+
+        self.latency = 0 if not depth[0] else 1 if depth[0] < 3 else 2
+        self.registered_ready = all(depth)
+
+        super().__init__({
+            'input': In(stream_signature),
+            'output': Out(stream_signature),
+            'branches': Out(stream_signature).array(n - 1),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        outputs = []
+
+        for i, (output, depth) in enumerate(zip([self.output, *self.branches], self.depth)):
+            # A skid buffer holds two beats at full rate, which a FIFO can't do below a depth of 3.
+            if depth:
+                m.submodules[f'buffer_{i}'] = buffer = SkidBuffer(self.output.signature) if depth < 3 else FIFO(self.output.signature, depth)
+                connect(m, buffer.output, flipped(output))
+                output = buffer.input
+
+            outputs.append(output)
+
+        # Tracks which outputs already accepted the current input beat.
+        done = Signal(self.n)
+
+        m.d.comb += self.input.ready.eq(Cat(output.ready | done[i] for i, output in enumerate(outputs)).all())
+
+        for i, output in enumerate(outputs):
+            m.d.comb += [
+                output.wrap().eq(self.input.wrap()),
+                output.valid.eq(self.input.valid & ~done[i]),
+            ]
+
+            with m.If(self.input.valid & ~self.input.ready & output.ready):
+                m.d.sync += done[i].eq(1)
+
+        with m.If(self.input.valid & self.input.ready):
+            m.d.sync += done.eq(0)
+
+        return m
+
+class ReverseBuffer(Component):
+    def __init__(self, stream_signature):
+        self.latency = 0
+        self.registered_ready = True
+
+        super().__init__({
+            'input': In(stream_signature),
+            'output': Out(stream_signature),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        skid = Signal(len(self.input.wrap()))
+        skid_valid = Signal()
+
+        m.d.comb += [
+            self.input.ready.eq(~skid_valid),
+            self.output.valid.eq(self.input.valid | skid_valid),
+            self.output.wrap().eq(Mux(skid_valid, skid, self.input.wrap())),
+        ]
+
+        with m.If(self.output.ready):
+            m.d.sync += skid_valid.eq(0)
+
+        with m.Elif(self.input.valid & ~skid_valid):
+            m.d.sync += skid_valid.eq(1)
+            m.d.sync += skid.eq(self.input.wrap())
+
+        return m
+
+class Pipeline(Component):
+    stage_types = {
+        'forward': Buffer,
+        'backward': ReverseBuffer,
+        'both': SkidBuffer,
+    }
+
+    def __init__(self, stream_signature, depth, *, mode = 'both'):
+        if isinstance(mode, str):
+            mode = [mode] * depth
+
+        assert len(mode) == depth
+        assert all(stage_mode in self.stage_types for stage_mode in mode)
+
+        self.depth = depth
+        self.mode = mode
+
+        self.stages = [self.stage_types[stage_mode](stream_signature) for stage_mode in mode]
+
+        self.latency = sum(stage.latency for stage in self.stages)
+        self.registered_ready = bool(self.stages) and self.stages[0].registered_ready
+
+        super().__init__({
+            'input': In(stream_signature),
+            'output': Out(stream_signature),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        for i, stage in enumerate(self.stages):
+            m.submodules[f'stage_{i}'] = stage
+
+        interfaces = [flipped(self.input)] + [port for stage in self.stages for port in (stage.input, stage.output)] + [flipped(self.output)]
+
+        for source, sink in zip(interfaces[::2], interfaces[1::2]):
+            connect(m, source, sink)
+
+        return m
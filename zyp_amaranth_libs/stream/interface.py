@@ -1,7 +1,10 @@
 from amaranth import *
-from amaranth.lib.wiring import Signature, In, Out, PureInterface, connect
+from amaranth.lib.wiring import Signature, FlippedSignature, In, Out, PureInterface, connect
 
 import itertools
+import warnings
+
+from .components import SkidBuffer
 
 __all__ = [
     'StreamInterface',
@@ -9,8 +12,49 @@ __all__ = [
     'StreamSignature',
     'cross_connect',
     'connect_pipeline',
+    'PipelineReport',
 ]
 
+async def _aiter(values):
+    if hasattr(values, '__aiter__'):
+        async for value in values:
+            yield value
+    else:
+        for value in values:
+            yield value
+
+async def _throttle(sim, signal, schedule):
+    # Holds the handshake signal low for the cycles the schedule skips, then asserts it.
+    if schedule is not None:
+        while not next(schedule):
+            await signal.set(0)
+            await sim.tick()
+
+    await signal.set(1)
+
+# The bulk drivers below spend exactly one clock edge per beat when the other side keeps up. The handshake is
+# sampled at the edge itself, so valid/ready stay asserted from one beat to the next instead of being polled
+# with until() and followed by a separate transfer tick.
+
+async def _transfer(sim, valid, ready, schedule):
+    # Holds valid through clock edges until one of them sees ready.
+    await _throttle(sim, valid, schedule)
+
+    while True:
+        *_, r = await sim.tick().sample(ready)
+
+        if r:
+            return
+
+async def _accept(sim, valid, ready, schedule, *values):
+    # Asserts ready for one clock edge, and returns the values sampled at it if a beat was transferred.
+    await _throttle(sim, ready, schedule)
+
+    *_, v = result = await sim.tick().sample(*values, valid)
+
+    if v:
+        return result[-len(values) - 1:-1]
+
 class StreamInterface(PureInterface):
     def __init__(self, signature, *, path, src_loc_at = 0):
         super().__init__(signature, path = path, src_loc_at = src_loc_at + 1)
@@ -27,10 +71,13 @@ class StreamInterface(PureInterface):
         if 'last' in self.signature.members:
             signals.append(self.last)
 
+        if 'keep' in self.signature.members:
+            signals.append(self.keep)
+
         return Cat(signals)
 
-    async def recv(self, sim):
-        await self.ready.set(1)
+    async def recv(self, sim, *, schedule = None):
+        await _throttle(sim, self.ready, schedule)
         await sim.tick().until(self.valid)
         
         value = await self.data.get()
@@ -40,15 +87,54 @@ class StreamInterface(PureInterface):
 
         return value
 
-    async def send(self, sim, value):
+    async def send(self, sim, value, *, schedule = None):
         await self.data.set(value)
 
-        await self.valid.set(1)
+        await _throttle(sim, self.valid, schedule)
         await sim.tick().until(self.ready)
 
         await sim.tick()
         await self.valid.set(0)
 
+    async def recv_iter(self, sim, count = None, *, schedule = None):
+        for _ in itertools.count() if count is None else range(count):
+            beat = None
+
+            while beat is None:
+                beat = await _accept(sim, self.valid, self.ready, schedule, self.data)
+
+            # Drop ready while the caller holds control, so beats aren't lost if it advances time before resuming.
+            # Ready is reasserted on resume, so no clock edge sees it low unless the caller does advance time.
+            await self.ready.set(0)
+            yield beat[0]
+
+    async def recv_many(self, sim, count, *, schedule = None):
+        values = []
+
+        while len(values) < count:
+            beat = await _accept(sim, self.valid, self.ready, schedule, self.data)
+
+            if beat is not None:
+                values.append(beat[0])
+
+        await self.ready.set(0)
+
+        return values
+
+    async def send_many(self, sim, values, *, schedule = None):
+        # Only an async producer can advance time while the next value is fetched.
+        producer_waits = hasattr(values, '__aiter__')
+
+        async for value in _aiter(values):
+            await self.data.set(value)
+            await _transfer(sim, self.valid, self.ready, schedule)
+
+            # Drop valid while an async producer has control, so the previous beat isn't sent again if it advances time.
+            if producer_waits:
+                await self.valid.set(0)
+
+        await self.valid.set(0)
+
 class MultilaneStreamInterface(PureInterface):
     def __init__(self, signature, *, path, src_loc_at = 0):
         super().__init__(signature, path = path, src_loc_at = src_loc_at + 1)
@@ -65,25 +151,45 @@ class MultilaneStreamInterface(PureInterface):
         if 'last' in self.signature.members:
             signals.append(self.last)
 
+        if 'keep' in self.signature.members:
+            signals.append(self.keep)
+
         return Cat(signals)
 
-    async def recv_packet(self, sim):
-        assert 'last' in self.signature.members
+    async def _get_beat(self, values):
+        for i in range(self.signature.lanes):
+            if 'keep' not in self.signature.members or await self.keep[i].get():
+                values.append(await self.data[i].get())
+
+            if await self.last[i].get():
+                return True
+
+        return False
 
-        await self.ready.set(1)
+    async def _set_beat(self, data, first, last):
+        for i, value in enumerate(data):
+            await self.data[i].set(value)
+
+            if 'first' in self.signature.members:
+                await self.first[i].set(first and i == 0)
+            if 'last' in self.signature.members:
+                await self.last[i].set(last and i == len(data) - 1)
+
+        if 'keep' in self.signature.members:
+            for i in range(self.signature.lanes):
+                await self.keep[i].set(i < len(data))
+
+    async def recv_packet(self, sim, *, schedule = None):
+        assert 'last' in self.signature.members
 
         values = []
         done = False
 
         while not done:
+            await _throttle(sim, self.ready, schedule)
             await sim.tick().until(self.valid)
 
-            for i in range(self.signature.lanes):
-                values.append(await self.data[i].get())
-
-                if await self.last[i].get():
-                    done = True
-                    break
+            done = await self._get_beat(values)
 
             if not done:
                 await sim.tick()
@@ -92,29 +198,166 @@ class MultilaneStreamInterface(PureInterface):
 
         return values
 
-    async def send_packet(self, sim, values):
+    def _decode_beat(self, values, data, last, keep = None):
+        width = len(self.data[0])
+
+        for i in range(self.signature.lanes):
+            if keep is None or keep >> i & 1:
+                values.append(data >> (i * width) & ((1 << width) - 1))
+
+            if last >> i & 1:
+                return True
+
+        return False
+
+    async def packets(self, sim, count = None, *, schedule = None):
+        assert 'last' in self.signature.members
+
+        beat = [Cat(self.data), Cat(self.last)]
+
+        if 'keep' in self.signature.members:
+            beat.append(Cat(self.keep))
+
+        for _ in itertools.count() if count is None else range(count):
+            values = []
+            done = False
+
+            while not done:
+                sampled = await _accept(sim, self.valid, self.ready, schedule, *beat)
+
+                if sampled is not None:
+                    done = self._decode_beat(values, *sampled)
+
+            # Drop ready while the caller holds control, so beats aren't lost if it advances time before resuming.
+            # Ready is reasserted on resume, so no clock edge sees it low across a packet boundary unless the caller advances time.
+            await self.ready.set(0)
+            yield values
+
+    async def send_packet(self, sim, values, *, schedule = None):
         transactions = list(itertools.batched(values, self.signature.lanes))
         first = 0
         last = len(transactions) - 1
 
         for transaction_num, data in enumerate(transactions):
             await sim.delay(1e-12)
-            await self.valid.set(1)
-            for i, value in enumerate(data):
-                await self.data[i].set(value)
-
-                if 'first' in self.signature.members:
-                    await self.first[i].set(transaction_num == first and i == 0)
-                if 'last' in self.signature.members:
-                    await self.last[i].set(transaction_num == last and i == len(data) - 1)
+            await _throttle(sim, self.valid, schedule)
+            await self._set_beat(data, transaction_num == first, transaction_num == last)
 
             await sim.tick().until(self.ready)
             await sim.tick()
         
         await self.valid.set(0)
 
+    async def send_packets(self, sim, packets, *, gap = 0, schedule = None):
+        # Only an async producer can advance time while the next packet is fetched.
+        producer_waits = hasattr(packets, '__aiter__')
+
+        async for values in _aiter(packets):
+            transactions = list(itertools.batched(values, self.signature.lanes))
+            first = 0
+            last = len(transactions) - 1
+
+            for transaction_num, data in enumerate(transactions):
+                await self._set_beat(data, transaction_num == first, transaction_num == last)
+                await _transfer(sim, self.valid, self.ready, schedule)
+
+            # Valid stays asserted into the next packet, unless there's a gap or an async producer has control.
+            if gap or producer_waits:
+                await self.valid.set(0)
+
+            for _ in range(gap):
+                await sim.tick()
+
+        await self.valid.set(0)
+
+    def _lane_bytes(self):
+        width = len(self.data[0])
+        assert width % 8 == 0, 'Byte-oriented packet helpers require a lane width that is a multiple of 8 bits.'
+        return width // 8
+
+    async def recv_packet_bytes(self, sim, out = None, *, schedule = None):
+        assert 'last' in self.signature.members
+
+        lanes = self.signature.lanes
+        lane_bytes = self._lane_bytes()
+        beat_bytes = lane_bytes * lanes
+
+        data = Cat(self.data)
+        last = Cat(self.last)
+        keep = Cat(self.keep) if 'keep' in self.signature.members else None
+
+        result = bytearray() if out is None else memoryview(out).cast('B')
+        length = 0
+
+        while True:
+            await _throttle(sim, self.ready, schedule)
+            await sim.tick().until(self.valid)
+
+            value = await data.get()
+            end = await last.get()
+
+            count = end.bit_length() if end else lanes
+            mask = (1 << count) - 1
+            chunk = value.to_bytes(beat_bytes, 'little')
+
+            kept = mask if keep is None else await keep.get() & mask
+
+            if kept != mask:
+                chunk = b''.join(chunk[i * lane_bytes:(i + 1) * lane_bytes] for i in range(count) if kept >> i & 1)
+            else:
+                chunk = chunk[:count * lane_bytes]
+
+            if out is None:
+                result += chunk
+            else:
+                result[length:length + len(chunk)] = chunk
+
+            length += len(chunk)
+
+            if end:
+                break
+
+            await sim.tick()
+
+        await self.ready.set(0)
+
+        return result if out is None else length
+
+    async def send_packet_bytes(self, sim, buffer, *, schedule = None):
+        view = memoryview(buffer).cast('B')
+
+        lane_bytes = self._lane_bytes()
+        beat_bytes = lane_bytes * self.signature.lanes
+
+        assert len(view) % lane_bytes == 0
+
+        data = Cat(self.data)
+        first = Cat(self.first) if 'first' in self.signature.members else None
+        last = Cat(self.last) if 'last' in self.signature.members else None
+        keep = Cat(self.keep) if 'keep' in self.signature.members else None
+
+        for offset in range(0, len(view), beat_bytes):
+            chunk = view[offset:offset + beat_bytes]
+            count = len(chunk) // lane_bytes
+
+            await sim.delay(1e-12)
+            await _throttle(sim, self.valid, schedule)
+            await data.set(int.from_bytes(chunk, 'little'))
+
+            if first is not None:
+                await first.set(offset == 0)
+            if last is not None:
+                await last.set(1 << (count - 1) if offset + beat_bytes >= len(view) else 0)
+            if keep is not None:
+                await keep.set((1 << count) - 1)
+
+            await sim.tick().until(self.ready)
+            await sim.tick()
+
+        await self.valid.set(0)
+
 class StreamSignature(Signature):
-    def __init__(self, data_shape, *, backpressure = True, first = False, last = False, lanes = None):
+    def __init__(self, data_shape, *, backpressure = True, first = False, last = False, keep = False, lanes = None):
         members = {
             'data': Out(data_shape),
             'valid': Out(1),
@@ -127,8 +370,11 @@ class StreamSignature(Signature):
         if last:
             members['last'] = Out(1)
 
+        if keep:
+            members['keep'] = Out(1)
+
         if lanes is not None:
-            for name in ['data', 'first', 'last']:
+            for name in ['data', 'first', 'last', 'keep']:
                 if name in members:
                     members[name] = members[name].array(lanes)
 
@@ -162,7 +408,49 @@ class _InputInterface:
         self.input = input
         self.signature = Signature({'input': Out(input.signature)})
 
-def connect_pipeline(m, *interfaces):
+class PipelineReport:
+    def __init__(self, stages, max_ready_chain = None):
+        # Each stage is (interface, latency, registered_ready); latency is None where it isn't fixed, e.g. across clock domains.
+        self.stages = stages
+        self.max_ready_chain = max_ready_chain
+
+        latencies = [latency for _, latency, _ in stages]
+        self.latency = None if None in latencies else sum(latencies)
+
+        self.ready_chains = []
+        chain = []
+
+        for stage in stages:
+            _, _, registered_ready = stage
+
+            if registered_ready:
+                if chain:
+                    self.ready_chains.append(chain)
+                chain = []
+            else:
+                chain.append(stage)
+
+        if chain:
+            self.ready_chains.append(chain)
+
+    @property
+    def long_ready_chains(self):
+        if self.max_ready_chain is None:
+            return []
+
+        return [chain for chain in self.ready_chains if len(chain) > self.max_ready_chain]
+
+    def __str__(self):
+        lines = [f'{type(interface).__name__}: latency={latency}, registered_ready={registered_ready}' for interface, latency, registered_ready in self.stages]
+        lines.append(f'Total latency: {self.latency}')
+        lines.append(f'Longest ready chain: {max((len(chain) for chain in self.ready_chains), default = 0)}')
+        return '\n'.join(lines)
+
+def _stage_info(interface):
+    # Stages that don't describe themselves are assumed to be combinational in both directions.
+    return interface, getattr(interface, 'latency', 0), getattr(interface, 'registered_ready', False)
+
+def connect_pipeline(m, *interfaces, max_ready_chain = None, insert_buffers = False):
     interfaces = list(interfaces)
 
     if not 'output' in interfaces[0].signature.members:
@@ -171,8 +459,38 @@ def connect_pipeline(m, *interfaces):
     if not 'input' in interfaces[-1].signature.members:
         interfaces[-1] = _InputInterface(interfaces[-1])
 
+    stages = []
+    chain = 0
+
     for source, sink in itertools.pairwise(interfaces):
         assert 'output' in source.signature.members
         assert 'input' in sink.signature.members
 
+        if not isinstance(source, _OutputInterface):
+            stages.append(_stage_info(source))
+            chain = 0 if stages[-1][2] else chain + 1
+
+        if insert_buffers and max_ready_chain is not None and chain >= max_ready_chain and not isinstance(sink, _InputInterface):
+            signature = source.output.signature
+            if isinstance(signature, FlippedSignature):
+                signature = signature.flip()
+
+            buffer = SkidBuffer(signature)
+            m.submodules += buffer
+
+            connect(m, source.output, buffer.input)
+            stages.append(_stage_info(buffer))
+            chain = 0
+            source = buffer
+
         connect(m, source.output, sink.input)
+
+    if not isinstance(interfaces[-1], _InputInterface):
+        stages.append(_stage_info(interfaces[-1]))
+
+    report = PipelineReport(stages, max_ready_chain)
+
+    for chain in report.long_ready_chains:
+        warnings.warn(f'Pipeline has a combinational ready path through {len(chain)} stages: {", ".join(type(interface).__name__ for interface, _, _ in chain)}')
+
+    return report
@@ -0,0 +1,151 @@
+from amaranth import *
+from amaranth.lib.wiring import Component, In, Out
+
+from collections import Counter, deque
+
+__all__ = [
+    'StreamMonitor',
+    'StreamCounters',
+]
+
+class StreamMonitor:
+    def __init__(self, sim, interface, *, domain = 'sync', upstream = None):
+        self.interface = interface
+        self.domain = domain
+        self.upstream = upstream
+
+        self.cycles = 0
+        self.transfers = 0
+        self.stalls = 0
+        self.bubbles = 0
+        self.packets = 0
+
+        # Cycles from the first to the last beat of each packet.
+        self.packet_cycles = Counter()
+
+        # Cycles from a packet ending at the upstream monitor to it ending here.
+        self.latency = Counter()
+
+        self._packet_start = None
+        self._ends = None
+
+        if upstream is not None:
+            assert upstream._ends is None, 'Monitor already has a downstream monitor attached.'
+            upstream._ends = deque()
+
+        sim.add_process(self.process, passive = True)
+
+    def reset(self):
+        self.cycles = 0
+        self.transfers = 0
+        self.stalls = 0
+        self.bubbles = 0
+        self.packets = 0
+        self.packet_cycles.clear()
+        self.latency.clear()
+
+        self._packet_start = None
+
+        if self._ends is not None:
+            self._ends.clear()
+
+    @property
+    def throughput(self):
+        return self.transfers / self.cycles if self.cycles else 0
+
+    async def process(self, sim):
+        valid = self.interface.valid
+        ready = self.interface.ready if self.interface.signature.backpressure else C(1)
+        last = Cat(self.interface.last).any() if 'last' in self.interface.signature.members else C(1)
+
+        cycle = 0
+
+        while True:
+            # Sampled at the clock edge, so the result doesn't depend on whether the drivers run before this process.
+            *_, v, r, l = await sim.tick(self.domain).sample(valid, ready, last)
+
+            cycle += 1
+            self.cycles += 1
+
+            if v and r:
+                self.transfers += 1
+
+                if self._packet_start is None:
+                    self._packet_start = cycle
+
+                if l:
+                    self.packets += 1
+                    self.packet_cycles[cycle - self._packet_start + 1] += 1
+                    self._packet_start = None
+
+                    if self._ends is not None:
+                        self._ends.append(cycle)
+
+                    if self.upstream is not None and self.upstream._ends:
+                        self.latency[cycle - self.upstream._ends.popleft()] += 1
+
+            elif v:
+                self.stalls += 1
+
+            elif r:
+                self.bubbles += 1
+
+class StreamCounters(Component):
+    def __init__(self, stream_signature, *, width = 32):
+        self.has_last = 'last' in stream_signature.members
+
+        members = {
+            'valid': In(1),
+            'ready': In(1),
+            'clear': In(1),
+            'cycles': Out(width),
+            'transfers': Out(width),
+            'stalls': Out(width),
+            'bubbles': Out(width),
+        }
+
+        if self.has_last:
+            members['last'] = In(1)
+            members['packets'] = Out(width)
+
+        super().__init__(members)
+
+    def tap(self, m, interface):
+        m.d.comb += [
+            self.valid.eq(interface.valid),
+            self.ready.eq(interface.ready),
+        ]
+
+        if self.has_last:
+            m.d.comb += self.last.eq(Cat(interface.last).any())
+
+    def elaborate(self, platform):
+        m = Module()
+
+        m.d.sync += self.cycles.eq(self.cycles + 1)
+
+        with m.If(self.valid & self.ready):
+            m.d.sync += self.transfers.eq(self.transfers + 1)
+
+            if self.has_last:
+                with m.If(self.last):
+                    m.d.sync += self.packets.eq(self.packets + 1)
+
+        with m.Elif(self.valid):
+            m.d.sync += self.stalls.eq(self.stalls + 1)
+
+        with m.Elif(self.ready):
+            m.d.sync += self.bubbles.eq(self.bubbles + 1)
+
+        with m.If(self.clear):
+            m.d.sync += [
+                self.cycles.eq(0),
+                self.transfers.eq(0),
+                self.stalls.eq(0),
+                self.bubbles.eq(0),
+            ]
+
+            if self.has_last:
+                m.d.sync += self.packets.eq(0)
+
+        return m
@@ -0,0 +1,57 @@
+import itertools
+import random
+
+__all__ = [
+    'RandomSchedule',
+    'BurstSchedule',
+    'ReplaySchedule',
+]
+
+class RandomSchedule:
+    def __init__(self, probability, *, seed = None):
+        assert 0 < probability <= 1
+
+        self.probability = probability
+        self.random = random.Random(seed)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.random.random() < self.probability
+
+class BurstSchedule:
+    def __init__(self, on, off, *, seed = None):
+        # Burst and gap lengths are either fixed, or drawn uniformly from an inclusive (min, max) range.
+        self.on = on if isinstance(on, tuple) else (on, on)
+        self.off = off if isinstance(off, tuple) else (off, off)
+
+        assert self.on[1] > 0
+
+        self.random = random.Random(seed)
+        self.state = True
+        self.remaining = self.random.randint(*self.on)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while self.remaining == 0:
+            self.state = not self.state
+            self.remaining = self.random.randint(*(self.on if self.state else self.off))
+
+        self.remaining -= 1
+
+        return self.state
+
+class ReplaySchedule:
+    def __init__(self, pattern, *, loop = True):
+        self.pattern = [bool(int(value)) for value in pattern]
+        self.iterator = itertools.cycle(self.pattern) if loop else iter(self.pattern)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # A finished non-looping pattern keeps asserting.
+        return next(self.iterator, True)